@@ -1,10 +1,36 @@
 import json
 from pathlib import Path
-from typing import List, Set
+from typing import Callable, Dict, List, Optional, Tuple
 from .context import get_shared_data
-    
-    
-    
+
+
+# Parsed JSON files keyed by path; TransferContext is created per call, so
+# the cache has to outlive the instances.
+_JSON_CACHE: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+# payload dir -> (meta it was built from, sorted (prefix, dst) pairs)
+_PATH_MAP_CACHE: Dict[str, Tuple[dict, List[Tuple[str, str]]]] = {}
+
+
+def _read_json_cached(path: Path) -> Optional[dict]:
+    """
+    Parse a JSON file, reusing the previous result while its
+    ``(st_mtime_ns, st_size)`` is unchanged. Returns ``None`` if missing.
+    """
+    key = str(path)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        _JSON_CACHE.pop(key, None)
+        return None
+
+    sig = (st.st_mtime_ns, st.st_size)
+    cached = _JSON_CACHE.get(key)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    _JSON_CACHE[key] = (sig, data)
+    return data
 
 
 def _load_transfer_config():
@@ -15,14 +41,54 @@ def _load_transfer_config():
     transfers_dir = lab_base / "Transfers"
     transfers_dir.mkdir(exist_ok=True)
 
-    cfg_path = transfers_dir / "transfer_config.json"
-    if not cfg_path.exists():
+    cfg = _read_json_cached(transfers_dir / "transfer_config.json")
+    if cfg is None:
         return {
             "active_transfer_id": None,
             "history": [],
             "ppl_to_transfer": {} #sqlit3
         }
-    return json.loads(cfg_path.read_text(encoding="utf-8"))
+    return cfg
+
+
+def _walk_config(cnfg, on_loc: Callable, on_src: Callable) -> None:
+    """
+    Visit every ``*loc*`` and ``*src*`` string value of a config in one pass.
+
+    Each value is replaced in place by the return of ``on_loc`` or
+    ``on_src``.
+    """
+    # Explicit stack instead of recursion: no frame per node and no
+    # recursion limit on deeply nested configs.
+    stack = [cnfg] if isinstance(cnfg, (dict, list)) else []
+    while stack:
+        d = stack.pop()
+        if isinstance(d, dict):
+            for k, v in d.items():
+                if "loc" in k and isinstance(v, str):
+                    d[k] = on_loc(v)
+                elif "src" in k and isinstance(v, str):
+                    d[k] = on_src(v)
+                elif isinstance(v, (dict, list)):
+                    # Scalar leaves have nothing to visit
+                    stack.append(v)
+        else:
+            stack.extend(v for v in d if isinstance(v, (dict, list)))
+
+
+def _map_prefix(src: str, path_map: List[Tuple[str, str]]) -> str:
+    """
+    Rewrite ``src`` with the first (longest) matching prefix in ``path_map``.
+
+    A prefix only matches whole path components, so ``/data/run1`` maps
+    ``/data/run1/x`` but not ``/data/run10/x``. Unmatched values (URLs,
+    relative paths) are returned exactly as given.
+    """
+    norm = Path(src).as_posix()
+    for prefix, dst in path_map:
+        if norm == prefix or (norm.startswith(prefix) and norm[len(prefix)] == "/"):
+            return dst + norm[len(prefix):]
+    return src
 # ---------------------------
 
 
@@ -62,64 +128,79 @@ class TransferContext:
             List of pipeline IDs that this pplid depends on
         """
         db = self._get_db()
-        dependencies = set()
-
-        def collect_deps(pplid: str):
+        if not recursive:
             rows = db.query(
-                "SELECT prev FROM edges WHERE next = ? LIMIT 1",
+                "SELECT prev FROM edges WHERE next = ? AND prev IS NOT NULL",
                 (pplid,)
             )
-            if rows and rows[0][0]:
-                prev_pplid = rows[0][0]
-                if prev_pplid not in dependencies:
-                    dependencies.add(prev_pplid)
-                    if recursive:
-                        collect_deps(prev_pplid)
-
-        collect_deps(pplid)
-        return list(dependencies)
+            return list({r[0] for r in rows})
+
+        # Walk the whole ancestor chain inside SQLite in a single query.
+        rows = db.query(
+            """
+            WITH RECURSIVE deps(p) AS (
+                SELECT prev FROM edges WHERE next = ?
+                UNION
+                SELECT e.prev FROM edges e JOIN deps ON e.next = deps.p
+            )
+            SELECT p FROM deps WHERE p IS NOT NULL
+            """,
+            (pplid,)
+        )
+        return [r[0] for r in rows]
 
     def _load_transfer_meta(self, transfer_id: str) -> dict:
         meta_path = self.transfers_dir / transfer_id / "transfer.json"
-        if not meta_path.exists():
-            return {}
-        return json.loads(meta_path.read_text(encoding="utf-8"))
+        meta = _read_json_cached(meta_path)
+        return {} if meta is None else meta
 
     def map_cnfg(self, cnfg): 
 
-        pplid = cnfg['pplid']       
-        def remap(d):
-            if isinstance(d, dict):
-                for k, v in d.items():
-                    if "loc" in k and isinstance(v, str):
-                        # Map LOC via transfer context
-                        d[k] = self.map_loc(v, pplid=pplid)
-                    elif 'src' in k and isinstance(v, str):
-                        # Map file paths via transfer context
-                        d[k] = self.map_src(v)
-                    else:
-                        remap(v)
-            elif isinstance(d, list):
-                for item in d:
-                    remap(item)
-        remap(cnfg)
+        # Resolve the transfer once; every key then maps from plain locals.
+        transfer_id = self._cfg["ppl_to_transfer"].get(cnfg['pplid'])
+        if not transfer_id:
+            return cnfg
+
+        loc_map = self._load_transfer_meta(transfer_id).get("loc_map", {})
+        path_map = self._get_path_map(transfer_id)
+
+        _walk_config(
+            cnfg,
+            on_loc=lambda v: loc_map.get(v, v),
+            on_src=lambda v: _map_prefix(v, path_map),
+        )
         return cnfg
 
     def map_src(self, src: str, pplid: str) -> str:
-        src = Path(src).as_posix()
         transfer_id = self._cfg["ppl_to_transfer"].get(pplid)
         if not transfer_id:
             return src
 
-        meta = self._load_transfer_meta(transfer_id)
-        path_map = meta.get("path_map", {})
+        return _map_prefix(src, self._get_path_map(transfer_id))
 
-        for src, dst in path_map.items():
-            dst = self.transfers_dir / transfer_id /"payload"/ dst
-            if src.startswith(src):
-                return src.replace(src, dst, 1)
+    def _get_path_map(self, transfer_id: str) -> List[Tuple[str, str]]:
+        """
+        Return ``(src_prefix, payload_dst)`` pairs for a transfer, longest
+        prefix first so nested paths win over their parents.
 
-        return src
+        The list is rebuilt only when the underlying meta is reloaded.
+        """
+        meta = self._load_transfer_meta(transfer_id)
+        payload = self.transfers_dir / transfer_id / "payload"
+        cached = _PATH_MAP_CACHE.get(str(payload))
+        if cached is not None and cached[0] is meta:
+            return cached[1]
+
+        # Keys are normalised like the src values they are matched against
+        entries = sorted(
+            (
+                (Path(prefix).as_posix().rstrip("/"), (payload / dst).as_posix())
+                for prefix, dst in meta.get("path_map", {}).items()
+            ),
+            key=lambda kv: -len(kv[0]),
+        )
+        _PATH_MAP_CACHE[str(payload)] = (meta, entries)
+        return entries
 
     def map_loc(self, loc: str, pplid: str) -> str:
         transfer_id = self._cfg["ppl_to_transfer"].get(pplid)
@@ -144,12 +225,21 @@ class TransferContext:
         Returns:
             Complete list of pipeline IDs including all dependencies
         """
-        all_pplids = set(pplids)
-        resolved = set(pplids)
-
-        for pplid in pplids:
-            deps = self.get_dependencies(pplid, recursive=True)
-            all_pplids.update(deps)
-            resolved.update(deps)
-
-        return list(all_pplids)
+        if not pplids:
+            return []
+
+        # Seed the CTE with every requested pplid so shared ancestors are
+        # only walked once.
+        rows = self._get_db().query(
+            """
+            WITH RECURSIVE deps(p) AS (
+                SELECT value FROM json_each(?)
+                UNION
+                SELECT e.prev FROM edges e JOIN deps ON e.next = deps.p
+            )
+            SELECT DISTINCT p FROM deps WHERE p IS NOT NULL
+            """,
+            (json.dumps(list(pplids)),)
+        )
+        # Inputs are always part of the result, even if the query failed
+        return list(dict.fromkeys([*pplids, *(r[0] for r in rows)]))
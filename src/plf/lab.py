@@ -76,6 +76,12 @@ def create_project(settings: dict) -> str:
 
     return setting_path
 
+# Indexes used by the dependency traversal in TransferContext
+EDGES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_edges_next ON edges(next);",
+    "CREATE INDEX IF NOT EXISTS idx_edges_prev ON edges(prev);",
+]
+
 def create_and_init_db(db_path: str, tables: list, init_statements: list = None):
     db = Db(db_path=db_path)
     for table_sql in tables:
@@ -137,7 +143,7 @@ def setup_databases(settings: dict):
             FOREIGN KEY(pplid) REFERENCES ppls(pplid)
         );
         """
-    ]
+    ] + EDGES_INDEXES
     create_and_init_db(ppls_db_path, ppls_tables)
 
     os.makedirs(os.path.join(settings["data_path"], "Archived"), exist_ok=True)
@@ -187,6 +193,15 @@ def lab_setup(settings_path: Optional[str]) -> None:
     )
 
     db.close()
+
+    # Labs created before EDGES_INDEXES existed get them here
+    ppls_db_path = os.path.join(settings["data_path"], "ppls.db")
+    if os.path.exists(ppls_db_path):
+        db = Db(db_path=ppls_db_path)
+        for index_sql in EDGES_INDEXES:
+            db.execute(index_sql)
+        db.close()
+
     set_shared_data(settings, logid)
     register_libs_path(settings["component_dir"])
    
@@ -0,0 +1,28 @@
+# tests/test_lab.py
+
+import os
+import sqlite3
+
+from plf.lab import lab_setup
+
+
+def _edge_indexes(db_path):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'edges'"
+        ).fetchall()
+    return sorted(r[0] for r in rows)
+
+
+def test_lab_setup_adds_edges_indexes_to_existing_lab(setup_lab_env):
+    settings = setup_lab_env["settings"]
+    db_path = os.path.join(settings["data_path"], "ppls.db")
+    assert _edge_indexes(db_path) == ["idx_edges_next", "idx_edges_prev"]
+
+    # Simulate a lab created before the indexes existed
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP INDEX idx_edges_next")
+        conn.execute("DROP INDEX idx_edges_prev")
+
+    lab_setup(settings["setting_path"])
+    assert _edge_indexes(db_path) == ["idx_edges_next", "idx_edges_prev"]
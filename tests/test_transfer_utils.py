@@ -0,0 +1,145 @@
+# tests/test_transfer_utils.py
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from plf._transfer_utils import TransferContext
+from plf.context import get_shared_data
+
+
+def _write_transfer(transfer_id, pplid, path_map, loc_map=None):
+    transfers_dir = Path(get_shared_data()["data_path"]).resolve() / "Transfers"
+    (transfers_dir / transfer_id).mkdir(parents=True, exist_ok=True)
+
+    cfg_path = transfers_dir / "transfer_config.json"
+    cfg = json.loads(cfg_path.read_text()) if cfg_path.exists() else {"ppl_to_transfer": {}}
+    cfg["ppl_to_transfer"][pplid] = transfer_id
+    cfg_path.write_text(json.dumps(cfg))
+
+    meta = {"path_map": path_map, "loc_map": loc_map or {}}
+    (transfers_dir / transfer_id / "transfer.json").write_text(json.dumps(meta))
+    return (transfers_dir / transfer_id / "payload").as_posix()
+
+
+@pytest.fixture
+def remote(setup_lab_env):
+    payload = _write_transfer(
+        "tr_map",
+        "ppl_map",
+        {"/data/run1": "r1", "/data": "root"},
+        {"old.Model": "new.Model"},
+    )
+    return TransferContext(), payload
+
+
+def test_map_src_prefers_longest_prefix(remote):
+    tsx, payload = remote
+    assert tsx.map_src("/data/run1/x.csv", pplid="ppl_map") == f"{payload}/r1/x.csv"
+    assert tsx.map_src("/data/other.csv", pplid="ppl_map") == f"{payload}/root/other.csv"
+
+
+def test_map_src_respects_path_boundaries(remote):
+    tsx, payload = remote
+    assert tsx.map_src("/data/run10/z", pplid="ppl_map") == f"{payload}/root/run10/z"
+    assert tsx.map_src("/data/run1", pplid="ppl_map") == f"{payload}/r1"
+
+
+def test_map_src_without_match(remote):
+    tsx, _ = remote
+    assert tsx.map_src("/elsewhere/a.csv", pplid="ppl_map") == "/elsewhere/a.csv"
+    assert tsx.map_src("/database/a.csv", pplid="ppl_map") == "/database/a.csv"
+    assert tsx.map_src("/data/a.csv", pplid="unknown") == "/data/a.csv"
+    assert tsx.map_src("s3://bucket/k", pplid="ppl_map") == "s3://bucket/k"
+    assert tsx.map_src("./data/x", pplid="ppl_map") == "./data/x"
+    assert tsx.map_src("s3://bucket/k", pplid="unknown") == "s3://bucket/k"
+
+
+def test_map_cnfg_nested(remote):
+    tsx, payload = remote
+    cnfg = {
+        "pplid": "ppl_map",
+        "workflow": {
+            "loc": "old.Model",
+            "args": {
+                "data_src": "/data/run1/train.csv",
+                "items": [{"loc": "old.Model", "val_src": "/data/val.csv"}, 3],
+                "epochs": 10,
+            },
+        },
+    }
+    tsx.map_cnfg(cnfg)
+
+    args = cnfg["workflow"]["args"]
+    assert cnfg["workflow"]["loc"] == "new.Model"
+    assert args["data_src"] == f"{payload}/r1/train.csv"
+    assert args["items"][0] == {"loc": "new.Model", "val_src": f"{payload}/root/val.csv"}
+    assert args["items"][1] == 3
+    assert args["epochs"] == 10
+
+
+@pytest.fixture
+def diamond(setup_lab_env):
+    # d depends on b and c, which both depend on a
+    from plf.utils import Db
+
+    db = Db(db_path=f"{get_shared_data()['data_path']}/ppls.db")
+    for pplid in ["dm_a", "dm_b", "dm_c", "dm_d"]:
+        db.execute("INSERT OR IGNORE INTO ppls (pplid, args_hash) VALUES (?, ?)", (pplid, pplid))
+    db.execute("DELETE FROM edges WHERE next LIKE 'dm_%'")
+    for prev, nxt in [("dm_a", "dm_b"), ("dm_a", "dm_c"), ("dm_b", "dm_d"), ("dm_c", "dm_d")]:
+        db.execute("INSERT INTO edges (prev, next) VALUES (?, ?)", (prev, nxt))
+    db.close()
+    return TransferContext()
+
+
+def test_get_dependencies_diamond(diamond):
+    assert sorted(diamond.get_dependencies("dm_d")) == ["dm_a", "dm_b", "dm_c"]
+    assert sorted(diamond.get_dependencies("dm_d", recursive=False)) == ["dm_b", "dm_c"]
+    assert diamond.get_dependencies("dm_a") == []
+
+
+def test_resolve_dependencies_shared_ancestors(diamond):
+    resolved = diamond.resolve_dependencies(["dm_d", "dm_c"])
+    assert resolved[:2] == ["dm_d", "dm_c"]
+    assert sorted(resolved) == ["dm_a", "dm_b", "dm_c", "dm_d"]
+
+
+def test_resolve_dependencies_keeps_inputs_on_query_failure(diamond, monkeypatch):
+    monkeypatch.setattr(type(diamond._get_db()), "query", lambda self, q, p=(): [])
+    assert diamond.resolve_dependencies(["dm_d", "dm_x"]) == ["dm_d", "dm_x"]
+
+
+def test_transfer_meta_cached_across_instances(setup_lab_env):
+    _write_transfer("tr_cache", "ppl_cache", {"/in": "a"})
+    first = TransferContext()._load_transfer_meta("tr_cache")
+    assert TransferContext()._load_transfer_meta("tr_cache") is first
+
+
+def test_transfer_meta_reloaded_when_rewritten(setup_lab_env):
+    payload = _write_transfer("tr_stale", "ppl_stale", {"/in": "a"})
+    meta_path = Path(payload).parent / "transfer.json"
+    assert TransferContext().map_src("/in/x", pplid="ppl_stale") == f"{payload}/a/x"
+
+    # Same mtime, different content: size alone must invalidate the cache
+    st = meta_path.stat()
+    _write_transfer("tr_stale", "ppl_stale", {"/in": "bb"})
+    os.utime(meta_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert TransferContext().map_src("/in/x", pplid="ppl_stale") == f"{payload}/bb/x"
+
+
+def test_map_cnfg_without_transfer_leaves_config_unchanged(remote):
+    tsx, _ = remote
+    cnfg = {
+        "pplid": "ppl_untransferred",
+        "workflow": {
+            "loc": "old.Model",
+            "args": {"data_src": "https://host/x", "val_src": "./data/val.csv"},
+        },
+    }
+    tsx.map_cnfg(cnfg)
+
+    assert cnfg["workflow"]["loc"] == "old.Model"
+    assert cnfg["workflow"]["args"] == {"data_src": "https://host/x", "val_src": "./data/val.csv"}